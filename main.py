@@ -7,10 +7,41 @@ from spotify_codes import (
     ACCEPTABLE_BG_COLORS,
     ACCEPTABLE_BAR_COLORS,
 )
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import os
 
 LOGO_PATH = os.path.join(os.path.dirname(__file__), "logo.png")
+# Write intermediate images (e.g. the detected ROI) to disk for inspection
+DEBUG = False
+
+
+def _roundtrip(
+    renderer: Renderer,
+    media_ref: int,
+    encoder: Encoder,
+    decoder: Decoder,
+    parser: Parser,
+):
+    """Encode, render, parse and decode one media reference, reporting failures."""
+    bg_color = renderer.bg_color
+    try:
+        # Encode to bar heights
+        bar_heights = encoder.encode(media_ref)
+
+        # Render to image
+        name = f"{media_ref}_{bg_color}_{renderer.bar_color}_code.png"
+        renderer.render(bar_heights, name, compress_level=1)
+
+        # Parse back from image
+        parsed_heights = parser.parse(name)
+        assert bar_heights == parsed_heights, "Parsed heights do not match original!"
+
+        # Decode back to media reference
+        decoded_ref = decoder.decode(bar_heights)
+        assert media_ref == decoded_ref, "Decoded reference does not match original!"
+    except Exception as e:
+        print(f"Error processing media reference {media_ref} with bg {bg_color}: {e}")
 
 
 def main():
@@ -29,42 +60,28 @@ def main():
     detector = Detector(LOGO_PATH)
 
     if False:
+        # Decode the logo once and share it across every color combination
+        base_renderer = Renderer(LOGO_PATH)
+        jobs = []
         for bg_color in ACCEPTABLE_BG_COLORS:
             for bar_color in ACCEPTABLE_BAR_COLORS:
                 try:
-                    renderer = Renderer(
-                        LOGO_PATH, bg_color=bg_color, bar_color=bar_color
-                    )
+                    renderer = base_renderer.with_colors(bg_color, bar_color)
                 except ValueError as e:
                     print(
                         f"Skipping invalid color combination bg:{bg_color} bar:{bar_color}: {e}"
                     )
                     continue
 
-                for media_ref in examples:
-                    try:
-                        # Encode to bar heights
-                        bar_heights = encoder.encode(media_ref)
-
-                        # Render to image
-                        name = f"{media_ref}_{bg_color}_code.png"
-                        renderer.render(bar_heights, name)
-
-                        # Parse back from image
-                        parsed_heights = parser.parse(name)
-                        assert (
-                            bar_heights == parsed_heights
-                        ), "Parsed heights do not match original!"
-
-                        # Decode back to media reference
-                        decoded_ref = decoder.decode(bar_heights)
-                        assert (
-                            media_ref == decoded_ref
-                        ), "Decoded reference does not match original!"
-                    except Exception as e:
-                        print(
-                            f"Error processing media reference {media_ref} with bg {bg_color}: {e}"
-                        )
+                jobs.extend((renderer, media_ref) for media_ref in examples)
+
+        # Every job writes its own file, so they can run concurrently; PNG
+        # encoding/decoding in Pillow releases the GIL.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for renderer, media_ref in jobs:
+                executor.submit(
+                    _roundtrip, renderer, media_ref, encoder, decoder, parser
+                )
 
     # Detect barcode region (logo + bars) and parse/decode from the ROI
     name = "5726865965_screenshot_dark_purple.png"
@@ -76,11 +93,13 @@ def main():
         x, y, w, h = result.position
         img = cv2.imread(name)
         roi = img[y : y + h, x : x + w]
-        roi_path = name.replace(".png", "_roi.png")
-        cv2.imwrite(roi_path, roi)
-        print(f"Detected barcode ROI: {(x, y, w, h)} -> {roi_path}")
+        print(f"Detected barcode ROI: {(x, y, w, h)}")
+        if DEBUG:
+            roi_path = name.replace(".png", "_roi.png")
+            cv2.imwrite(roi_path, roi, [cv2.IMWRITE_PNG_COMPRESSION, 0])
+            print(f"Wrote ROI to {roi_path}")
 
-        parsed_heights = parser.parse(roi_path)
+        parsed_heights = parser.parse_image(roi)
         print(f"Parsed Bar Heights (ROI): {parsed_heights}")
         decoded_ref = decoder.decode(parsed_heights)
         print(f"Decoded media reference (ROI): {decoded_ref}")
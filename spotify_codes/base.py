@@ -1,22 +1,90 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+import numpy as np
+
+
+def _crc8_table(polynomial: bytes) -> Tuple[int, ...]:
+    """Build the 256-entry byte-wise lookup table for an 8-bit CRC polynomial.
+
+    `polynomial` holds the coefficients MSB-first including the implicit
+    x^8 term, as in `BaseCodec.CRC_POLYNOMIAL`.
+    """
+    poly = 0
+    for coefficient in polynomial[1:]:
+        poly = (poly << 1) | coefficient
+
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def _permutation_index(length: int, step: int) -> np.ndarray:
+    """Source positions for selecting every step-th bit (mod length)."""
+    return (np.arange(length) * step) % length
+
+
+@lru_cache(maxsize=None)
+def _puncture_index(length: int) -> np.ndarray:
+    """Positions kept when removing every 3rd bit (1-based index)."""
+    return np.flatnonzero(np.arange(1, length + 1) % 3 != 0)
+
+
+# Valid bar heights. Whole-number floats such as 3.0 compare equal to their
+# ints and pass too; fractional heights do not.
+_BAR_HEIGHTS = frozenset(range(8))
+
+
+def _validate_bar_heights(bar_heights: Sequence[int]) -> None:
+    """Raise ValueError unless there are 23 bars with whole heights 0-7.
+
+    Shared by `Decoder` and `Renderer`; the range check is one C-level
+    subset test rather than a Python loop.
+    """
+    if len(bar_heights) != 23:
+        raise ValueError(f"Expected 23 bars, got {len(bar_heights)}")
+
+    if not _BAR_HEIGHTS.issuperset(bar_heights):
+        raise ValueError("Bar heights must be between 0 and 7 (whole numbers)")
 
 
 class BaseCodec:
     """Shared helpers for Spotify code encoding/decoding."""
 
     # CRC-8 polynomial (x^8 + x^2 + x + 1)
-    CRC_POLYNOMIAL = [1, 0, 0, 0, 0, 0, 1, 1, 1]
+    CRC_POLYNOMIAL = bytes([1, 0, 0, 0, 0, 0, 1, 1, 1])
+    CRC8_TABLE = _crc8_table(CRC_POLYNOMIAL)
+
+    # Bit-reversal of every byte value, for use with `bytes.translate`
+    BITREV8 = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
 
     # Gray code lookup table and inverse
-    GRAY_CODE = [0, 1, 3, 2, 7, 6, 4, 5]
-    GRAY_CODE_INVERSE = {v: i for i, v in enumerate(GRAY_CODE)}
+    GRAY_CODE = np.array([0, 1, 3, 2, 7, 6, 4, 5], dtype=np.uint8)
+    # Dense domain (0-7), so the inverse is a bytes table rather than a dict
+    GRAY_CODE_INVERSE = bytes(np.argsort(GRAY_CODE).tolist())
+
+    # Vectorized inverse Gray code table: height -> 3 bits
+    GRAY_TO_BITS = (
+        (np.frombuffer(GRAY_CODE_INVERSE, dtype=np.uint8)[:, None] >> [2, 1, 0]) & 1
+    ).astype(np.uint8)
+
+    # MSB-first bits of every byte value
+    BYTE_BITS = tuple(tuple((b >> s) & 1 for s in range(7, -1, -1)) for b in range(256))
+
+    # Positions kept when un-puncturing the 60 convolutional bits down to 45
+    UNPUNCTURE_IDX = np.flatnonzero(np.arange(60) % 4 != 2)
 
     def _int_to_bits(self, value: int, length: int) -> List[int]:
         """Convert integer to binary bit list (MSB-first)."""
-        bits = []
-        for i in range(length - 1, -1, -1):
-            bits.append((value >> i) & 1)
-        return bits
+        data = (value & ((1 << length) - 1)).to_bytes((length + 7) // 8, "big")
+        bits: List[int] = []
+        for byte in data:
+            bits.extend(self.BYTE_BITS[byte])
+        return bits[len(bits) - length :]
 
     def _bits_to_int(self, bits: List[int]) -> int:
         """Convert binary bit list (MSB-first) to integer."""
@@ -25,44 +93,14 @@ class BaseCodec:
             value = (value << 1) | bit
         return value
 
-    def _permute(self, bits: List[int], step: int = 7) -> List[int]:
-        """Permute bits by selecting every step-th bit (mod length)."""
-        permuted = [0] * len(bits)
-        for i in range(len(bits)):
-            permuted[i] = bits[(i * step) % len(bits)]
-        return permuted
-
-    def _unpermute(self, bits: List[int], step: int = 43) -> List[int]:
-        """Reverse the bit permutation used by `_permute`.
-
-        For a given length L and step s, choose s' such that s * s' ≡ 1 (mod L).
-        For encoder/decoder we use L=60, s=7, s'=43.
-        """
-        len_bits = len(bits)
-        return [bits[(step * i) % len_bits] for i in range(len_bits)]
-
-    def _puncture(self, bits: List[int]) -> List[int]:
-        """Puncture the code by removing every 3rd bit (1-based index)."""
-        return [bit for i, bit in enumerate(bits) if (i + 1) % 3 != 0]
-
-    def _unpuncture(self, bits: List[int]) -> List[int]:
-        """Inverse of `_puncture` for 60→45 mapping used here.
-
-        Extract columns where i % 4 != 2 over 60 positions.
-        """
-        return [bits[i] for i in range(60) if i % 4 != 2]
-
     def _bits_to_gray_heights(self, bits: List[int]) -> List[int]:
         """Convert bit triplets to Gray code bar heights (0-7)."""
-        heights = []
-        for i in range(0, len(bits), 3):
-            triplet = bits[i : i + 3]
-            while len(triplet) < 3:
-                triplet.append(0)
-            index = self._bits_to_int(triplet)
-            heights.append(self.GRAY_CODE[index])
+        bits_arr = np.asarray(bits, dtype=np.uint8)
+        # Zero-pad a trailing partial triplet
+        bits_arr = np.pad(bits_arr, (0, -len(bits_arr) % 3))
+        indices = bits_arr.reshape(-1, 3) @ [4, 2, 1]
 
-        return heights
+        return self.GRAY_CODE[indices].tolist()
 
     def _gray_height_to_bits(self, value: int) -> List[int]:
         """Convert a Gray-code encoded height (0-7) to a 3-bit list."""
@@ -71,32 +109,15 @@ class BaseCodec:
 
     def _gray_heights_to_bits(self, heights: List[int]) -> List[int]:
         """Convert list of heights (0-7) to concatenated 3-bit groups."""
-        bits: List[int] = []
-        for h in heights:
-            bits.extend(self._gray_height_to_bits(h))
-
-        return bits
-
-    def _crc8_core(self, bits: List[int], *, reverse_input: bool) -> List[int]:
-        """CRC-8 (x^8 + x^2 + x + 1) over 37 data bits.
-
-        The encoder variant uses the bits as-is; the decoder variant needs
-        `reverse_input=True` to match historical bit ordering in that path.
-        Returns 8 CRC bits (MSB-first in the algorithm's remainder order).
-        """
-        padded = [0, 0, 0] + (bits[::-1] if reverse_input else bits)
-        # Reverse byte order (reorder 8-bit chunks)
-        reversed_data = [
-            bit for i in range(len(padded) - 8, -1, -8) for bit in padded[i : i + 8]
-        ]
-
-        poly_degree = len(self.CRC_POLYNOMIAL) - 1
+        heights_arr = np.asarray(heights, dtype=np.intp)
 
-        remainder = reversed_data + [0] * poly_degree
+        return self.GRAY_TO_BITS[heights_arr].ravel().tolist()
 
-        for i in range(len(reversed_data)):
-            if remainder[i] == 1:
-                for j in range(len(self.CRC_POLYNOMIAL)):
-                    remainder[i + j] ^= self.CRC_POLYNOMIAL[j]
+    def _crc8_value(self, value: int) -> int:
+        """CRC-8 remainder of a 37-bit integer, as an 8-bit integer."""
+        # Prepending 3 zero bits gives 5 bytes, processed in reverse byte order
+        crc = 0
+        for byte in value.to_bytes(5, "little"):
+            crc = self.CRC8_TABLE[crc ^ byte]
 
-        return remainder[len(reversed_data) :]
+        return crc
@@ -1,5 +1,24 @@
-from typing import List
-from .base import BaseCodec
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+import numpy as np
+from .base import BaseCodec, _permutation_index, _validate_bar_heights
+
+
+def _conv_generator_inv(conv_gen: np.ndarray) -> np.ndarray:
+    """
+    Generate inverse convolutional generator matrix.
+
+    Build the 45x45 convolutional code generator inverse matrix.
+    Each row is a shifted (rotated right) version of the base generator
+    polynomials.
+    """
+    return np.stack([np.roll(conv_gen[(s - 27) % 3], s) for s in range(27, 72)])
+
+
+def _pack_columns(matrix: np.ndarray) -> Tuple[int, ...]:
+    """Pack each column of a binary matrix into an int (row r -> bit r)."""
+    weights = np.left_shift(np.uint64(1), np.arange(matrix.shape[0], dtype=np.uint64))
+    return tuple(int(column) for column in matrix.T.astype(np.uint64) @ weights)
 
 
 class Decoder(BaseCodec):
@@ -13,11 +32,25 @@ class Decoder(BaseCodec):
     # elements of the convolutionally encoded vector and multiplying
     # on the right by this matrix, we get back to the unencoded data,
     # assuming there are no errors.
-    CONV_GEN = [
-        [0, 1, 0, 1, 1, 1, 1, 0, 1, 1, 0, 0, 0, 1] + 31 * [0],
-        [1, 0, 1, 0, 1, 0, 1, 0, 0, 0, 1, 1, 1] + 32 * [0],
-        [0, 0, 1, 0, 1, 1, 1, 1, 1, 1, 0, 0, 1] + 32 * [0],
-    ]
+    CONV_GEN = np.array(
+        [
+            np.pad([0, 1, 0, 1, 1, 1, 1, 0, 1, 1, 0, 0, 0, 1], (0, 31)),
+            np.pad([1, 0, 1, 0, 1, 0, 1, 0, 0, 0, 1, 1, 1], (0, 32)),
+            np.pad([0, 0, 1, 0, 1, 1, 1, 1, 1, 1, 0, 0, 1], (0, 32)),
+        ],
+        dtype=np.uint8,
+    )
+
+    # The inverse generator only depends on CONV_GEN, so build it once.
+    CONV_GEN_INV = _conv_generator_inv(CONV_GEN)
+    CONV_GEN_INV_COLUMNS = _pack_columns(CONV_GEN_INV)
+
+    # Positions of the 20 data bars (skipping reference bars 0, 11 and 22)
+    DATA_BAR_IDX = np.r_[1:11, 12:22]
+    # Un-permuting (step 43, the inverse of the encoder's step 7 mod 60) then
+    # un-puncturing is a fixed 60 -> 45 gather, so compose both index maps
+    # once: conv_bits45 = level_bits[FUSED_IDX].
+    FUSED_IDX = _permutation_index(60, 43)[BaseCodec.UNPUNCTURE_IDX]
 
     def decode(self, bar_heights: List[int]) -> int:
         """
@@ -31,68 +64,101 @@ class Decoder(BaseCodec):
         4. Un-puncture bits
         5. Invert convolutional encoding
         6. Verify CRC
+
+        Results are memoized per distinct sequence of bar heights.
+
+        Raises:
+            ValueError: If there are not 23 bars or a height is not a whole number 0-7
         """
+        # NumPy indexing would silently wrap negative heights around
+        _validate_bar_heights(bar_heights)
+        media_ref = _decode_heights(tuple(bar_heights))
+        if media_ref < 0:
+            print("Error in levels; Use real decoder!!!")
+        return media_ref
+
+    def _decode(self, bar_heights: Tuple[int, ...]) -> int:
+        """Implementation of `decode` for already validated bar heights."""
+        # Every step up to the CRC check works on uint8 arrays so no
+        # intermediate Python lists are built between stages.
         # Step 1: Remove reference bars (first, 11th and last)
-        bar_heights = bar_heights[1:11] + bar_heights[12:-1]
+        heights = np.asarray(bar_heights, dtype=np.intp)[self.DATA_BAR_IDX]
 
         # Step 2: Convert Gray code bar heights to bits (20 heights = 60 bits)
-        level_bits = self._gray_heights_to_bits(bar_heights)
-
-        # Step 3: Un-permute bits (reverse of encoder permutation)
-        conv_bits = self._unpermute(level_bits, step=43)
+        level_bits = self.GRAY_TO_BITS[heights].ravel()
 
-        # Step 4: Un-puncture
-        conv_bits45 = self._unpuncture(conv_bits)
+        # Steps 3-4: Un-permute and un-puncture bits in a single gather
+        conv_bits45 = level_bits[self.FUSED_IDX]
 
         # Step 5: Convolutional decode using matrix multiplication
-        bin45 = self._matrix_multiply(conv_bits45, self._conv_generator_inv())
+        bin45 = self._matrix_multiply(conv_bits45, self.CONV_GEN_INV_COLUMNS)
 
         # Step 6: Verify CRC
         if self._check_crc(bin45):
-            media_ref = self._bits_to_int(bin45[:37][::-1])
-            return media_ref
-        else:
-            print("Error in levels; Use real decoder!!!")
-            return -1
+            return self._bits_to_int(bin45[:37][::-1])
+        return -1
+
+    def decode_batch(self, bar_heights_list: Sequence[List[int]]) -> List[int]:
+        """
+        Decode many sets of bar heights at once.
 
-    # Gray code, bit ops, permute/unpermute, puncture/unpuncture provided by BaseCodec.
+        Equivalent to calling `decode` on each entry, but Gray decoding,
+        un-permuting/un-puncturing and the convolutional decode run once
+        over a (B, 45) array with a single matrix multiplication.
 
-    def _shift_right(self, row: List[int], shift: int) -> List[int]:
-        """Shift a binary row to the right by shift positions."""
-        return row[-shift % len(row) : len(row) :] + row[0 : -shift % len(row)]
+        Args:
+            bar_heights_list: Sequence of bar height lists, all the same length
 
-    def _conv_generator_inv(self) -> List[List[int]]:
-        """
-        Generate inverse convolutional generator matrix.
+        Returns:
+            List of media references, -1 for entries that fail the CRC check
 
-        Build the 45x45 convolutional code generator inverse matrix.
-        Each row is a shifted version of the base generator polynomials.
+        Raises:
+            ValueError: If an entry does not have 23 bars with heights 0-7
         """
-        return [
-            self._shift_right(self.CONV_GEN[(s - 27) % 3], s) for s in range(27, 72)
-        ]
+        if len(bar_heights_list) == 0:
+            return []
 
-    def _matrix_multiply(
-        self, bits: List[int], generator: List[List[int]]
-    ) -> List[int]:
+        for bar_heights in bar_heights_list:
+            _validate_bar_heights(bar_heights)
+
+        heights = np.asarray(bar_heights_list, dtype=np.intp)[:, self.DATA_BAR_IDX]
+
+        level_bits = self.GRAY_TO_BITS[heights].reshape(len(heights), -1)
+        conv_bits45 = level_bits[:, self.FUSED_IDX]
+        bin45 = (conv_bits45 @ self.CONV_GEN_INV) & 1
+
+        media_refs = []
+        for bits in bin45.tolist():
+            if self._check_crc(bits):
+                media_refs.append(self._bits_to_int(bits[:37][::-1]))
+            else:
+                print("Error in levels; Use real decoder!!!")
+                media_refs.append(-1)
+
+        return media_refs
+
+    # Gray code and bit ops provided by BaseCodec.
+
+    def _matrix_multiply(self, bits: List[int], columns: Sequence[int]) -> List[int]:
         """
         Compute 45-bit convolutional code using the inverse generator matrix.
 
         Multiplies the input bit vector with each column of the inverse
-        convolutional generator matrix, computing the dot product modulo 2
-        for each column to produce 45 output bits.
+        convolutional generator matrix in GF(2). Both the input and the
+        columns are packed into ints, so each output bit is the parity of
+        `bits & column`, i.e. one AND and one popcount per column.
 
         Args:
             bits: List of 45 input bits for convolutional decoding
-            generator: 45x45 inverse convolutional generator matrix
+            columns: Packed columns of the 45x45 inverse generator matrix
 
         Returns:
             List of 45 encoded output bits
         """
-        return [
-            sum(int(a) * int(b) for a, b in zip(bits, col)) % 2
-            for col in zip(*generator)
-        ]
+        packed_bits = np.packbits(np.asarray(bits, dtype=np.uint8), bitorder="little")
+        packed = int.from_bytes(packed_bits.tobytes(), "little")
+        # bin().count rather than int.bit_count, which needs Python 3.10
+        return [bin(packed & column).count("1") & 1 for column in columns]
 
     def _check_crc(self, bits: List[int]) -> bool:
         """
@@ -106,5 +172,30 @@ class Decoder(BaseCodec):
         return calculated_crc == crc_bits
 
     def _crc8(self, bits: List[int]) -> List[int]:
-        """Decoder variant using shared CRC core with reversed input bits."""
-        return self._crc8_core(bits, reverse_input=True)
+        """
+        CRC-8 (x^8 + x^2 + x + 1) over 37 decoded data bits.
+
+        The decoded bits arrive in the reverse of the encoder's order, so
+        they are reversed before computing the same checksum as
+        `Encoder._crc8`.
+
+        Returns:
+            The 8 CRC bits, MSB-first
+        """
+        value = self._bits_to_int(bits)
+        # Reverse the 37 data bits without a list pass: bit-reverse each
+        # byte of the 40-bit word, swap byte order, drop the 3 pad bits.
+        reversed_bytes = value.to_bytes(5, "big").translate(self.BITREV8)
+        value = int.from_bytes(reversed_bytes, "little") >> 3
+
+        return self._int_to_bits(self._crc8_value(value), 8)
+
+
+@lru_cache(maxsize=1024)
+def _decode_heights(bar_heights: Tuple[int, ...]) -> int:
+    """Memoized `Decoder._decode`, shared by every decoder.
+
+    Decoders hold no state, so the cache is keyed on the bar heights alone
+    and keeps no decoder instance alive.
+    """
+    return Decoder()._decode(bar_heights)
@@ -1,9 +1,16 @@
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 import cv2
 import numpy as np
 from .renderer import ACCEPTABLE_BG_COLORS
 
+# Acceptable background colors in a fixed order, with their RGB values as an
+# (N, 3) array so distances to all of them are computed in one operation
+_BG_COLOR_NAMES = sorted(ACCEPTABLE_BG_COLORS)
+_BG_COLOR_RGB = np.array(
+    [list(bytes.fromhex(c[1:])) for c in _BG_COLOR_NAMES], dtype=np.int32
+)
+
 
 @dataclass
 class BarcodeResult:
@@ -18,6 +25,10 @@ class BarcodeResult:
 class Detector:
     """Detects and extracts Spotify barcodes from images."""
 
+    # Logo template scales tried by `_locate_logo`, most likely first so the
+    # early exit on a clearly good match usually fires after one or two
+    LOGO_SCALES = (1.0, 0.75, 1.25, 0.5, 1.5, 2.0)
+
     def __init__(
         self,
         logo_path: str,
@@ -36,6 +47,38 @@ class Detector:
 
         self.min_logo_confidence = min_logo_confidence
 
+        # Resized templates per scale, computed once; see `_locate_logo`
+        self._scaled_templates = self._scale_templates()
+
+    def _scale_templates(self) -> List[Tuple[float, int, np.ndarray]]:
+        """
+        Resize the logo template for every entry of `LOGO_SCALES`.
+
+        Whole octaves of a scale are handled by matching against an image
+        pyramid level instead, so each template is only resized by the
+        remaining factor.
+
+        Returns:
+            List of (scale, pyramid level, resized template)
+        """
+        scaled_templates = []
+        for scale in self.LOGO_SCALES:
+            level = 0
+            while scale / 2 ** (level + 1) >= 1.0:
+                level += 1
+            template_scale = scale / 2**level
+
+            logo_scaled = cv2.resize(
+                self.logo_template,
+                (
+                    int(self.logo_template.shape[1] * template_scale),
+                    int(self.logo_template.shape[0] * template_scale),
+                ),
+            )
+            scaled_templates.append((scale, level, logo_scaled))
+
+        return scaled_templates
+
     def detect_barcode(
         self,
         image_path: str,
@@ -58,8 +101,9 @@ class Detector:
                     error_message=f"Could not load image from {image_path}",
                 )
 
-            # Step 1: Locate logo
-            logo_pos, logo_confidence = self._locate_logo(image_cv)
+            # Step 1: Locate logo (grayscale conversion done once here)
+            image_gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
+            logo_pos, logo_confidence = self._locate_logo(image_gray)
             if logo_pos is None:
                 return BarcodeResult(
                     found=False,
@@ -105,43 +149,55 @@ class Detector:
         """
         Locate the Spotify logo in the image using template matching.
 
+        Args:
+            image: Grayscale image; a BGR image is converted first
+
         Returns:
             Tuple of (position, confidence) where position is (x, y, w, h)
             or (None, 0) if not found with sufficient confidence
         """
-        image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if image.ndim == 3:
+            image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            image_gray = image
 
         # Search across the full image; barcode can appear anywhere
         roi_gray = image_gray
 
-        # Try matching at a range of scales with normalized correlation
+        # Try matching at a range of scales with normalized correlation.
+        # Whole octaves of a scale are handled by an image pyramid (matching
+        # the template against a downsampled image is far cheaper than
+        # matching an upscaled template); only the remainder resizes the template.
+        pyramid = [roi_gray]
         best_val = -1.0
         best_loc = None
         best_scale = 1.0
 
-        for scale in [0.5, 0.75, 1.0, 1.25, 1.5, 2.0]:
-            logo_scaled = cv2.resize(
-                self.logo_template,
-                (
-                    int(self.logo_template.shape[1] * scale),
-                    int(self.logo_template.shape[0] * scale),
-                ),
-            )
+        for scale, level, logo_scaled in self._scaled_templates:
+            while len(pyramid) <= level:
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            level_gray = pyramid[level]
 
             if (
-                logo_scaled.shape[0] > roi_gray.shape[0]
-                or logo_scaled.shape[1] > roi_gray.shape[1]
+                logo_scaled.shape[0] > level_gray.shape[0]
+                or logo_scaled.shape[1] > level_gray.shape[1]
             ):
                 continue
 
-            result = cv2.matchTemplate(roi_gray, logo_scaled, cv2.TM_CCOEFF_NORMED)
+            result = cv2.matchTemplate(level_gray, logo_scaled, cv2.TM_CCOEFF_NORMED)
             min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
 
             if max_val > best_val:
                 best_val = max_val
-                best_loc = max_loc
+                # Map the match location back to full-resolution coordinates
+                best_loc = (max_loc[0] * 2**level, max_loc[1] * 2**level)
                 best_scale = scale
 
+            # A clearly good match will not be beaten meaningfully by the
+            # remaining (larger, more expensive) scales
+            if best_val > max(0.9, 2 * self.min_logo_confidence):
+                break
+
         # With TM_CCOEFF_NORMED, max_val is already in [-1, 1]; use it directly
         confidence = best_val if best_val is not None else 0.0
 
@@ -213,52 +269,43 @@ class Detector:
             The detected background color hex string, or None if invalid
         """
         h, w = region.shape[:2]
-        edge_samples = []
 
         # Sample edges more comprehensively
         margin = min(w // 8, h // 8, 15)
-
-        # Sample top edge
-        for y in range(0, min(margin, h)):
-            for x in range(0, w, max(1, w // 8)):
-                edge_samples.append(region[y, x])
-
-        # Sample bottom edge
-        for y in range(max(0, h - margin), h):
-            for x in range(0, w, max(1, w // 8)):
-                edge_samples.append(region[y, x])
-
-        # Sample left edge
-        for y in range(0, h, max(1, h // 8)):
-            for x in range(0, min(margin, w)):
-                edge_samples.append(region[y, x])
-
-        # Sample right edge
-        for y in range(0, h, max(1, h // 8)):
-            for x in range(max(0, w - margin), w):
-                edge_samples.append(region[y, x])
+        step_x = max(1, w // 8)
+        step_y = max(1, h // 8)
+
+        # Top, bottom, left and right edge strips as (N, 3) pixel arrays
+        edge_samples = np.concatenate(
+            [
+                region[:margin, ::step_x].reshape(-1, 3),
+                region[h - margin :, ::step_x].reshape(-1, 3),
+                region[::step_y, :margin].reshape(-1, 3),
+                region[::step_y, w - margin :].reshape(-1, 3),
+            ]
+        )
 
         if len(edge_samples) == 0:
             return None
 
-        edge_samples = np.array(edge_samples)
         dominant_color_bgr = edge_samples.mean(axis=0).astype(int)
 
-        # Convert BGR to RGB
-        r, g, b = dominant_color_bgr[2], dominant_color_bgr[1], dominant_color_bgr[0]
-
-        # Convert to hex
-        detected_hex = f"#{r:02x}{g:02x}{b:02x}"
-
-        # Check if it matches any acceptable color with generous tolerance
-        for acceptable_color in ACCEPTABLE_BG_COLORS:
-            if self._hex_color_distance(detected_hex, acceptable_color) < 80:
-                return acceptable_color
+        # Squared distance from the dominant color (BGR -> RGB) to every
+        # acceptable color; take the closest, with a generous tolerance
+        diff = _BG_COLOR_RGB - dominant_color_bgr[::-1]
+        distances = np.einsum("ij,ij->i", diff, diff)
+        closest = int(distances.argmin())
+        if distances[closest] < 80 * 80:
+            return _BG_COLOR_NAMES[closest]
 
         return None
 
-    def _hex_color_distance(self, hex1: str, hex2: str) -> float:
-        """Calculate Euclidean distance between two hex colors."""
-        r1, g1, b1 = int(hex1[1:3], 16), int(hex1[3:5], 16), int(hex1[5:7], 16)
-        r2, g2, b2 = int(hex2[1:3], 16), int(hex2[3:5], 16), int(hex2[5:7], 16)
-        return np.sqrt((r1 - r2) ** 2 + (g1 - g2) ** 2 + (b1 - b2) ** 2)
+    def _hex_color_distance(self, hex1: str, hex2: str) -> int:
+        """Calculate squared Euclidean distance between two hex colors.
+
+        Compare against a squared tolerance (e.g. 80 * 80); skipping the
+        square root keeps this in plain integer arithmetic.
+        """
+        r1, g1, b1 = bytes.fromhex(hex1[1:])
+        r2, g2, b2 = bytes.fromhex(hex2[1:])
+        return (r1 - r2) ** 2 + (g1 - g2) ** 2 + (b1 - b2) ** 2
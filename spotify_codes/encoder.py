@@ -1,13 +1,39 @@
-from typing import List
-from .base import BaseCodec
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+from .base import BaseCodec, _permutation_index, _puncture_index
 
 
 class Encoder(BaseCodec):
     """Encodes media reference into bar heights."""
 
-    # Convolutional code generators
-    G0 = [1, 1, 0, 1, 1, 0, 1]
-    G1 = [1, 0, 0, 1, 1, 1, 1]
+    # Convolutional code generators, tap j in bit j
+    # ([1, 1, 0, 1, 1, 0, 1] and [1, 0, 0, 1, 1, 1, 1])
+    G0 = 0b1011011
+    G1 = 0b1111001
+
+    MEDIA_REF_MASK = (1 << 37) - 1
+
+    # Gray code indexed by a bit triplet stored LSB-first
+    GRAY_CODE_LSB_FIRST = tuple(BaseCodec.GRAY_CODE[[0, 4, 2, 6, 1, 5, 3, 7]].tolist())
+
+    # Source position in the 90 interleaved bits of each of the 60 punctured
+    # and permuted bits; both steps have fixed lengths, so they fold into one
+    PUNCTURE_PERMUTE_SOURCE = tuple(
+        _puncture_index(90)[_permutation_index(60, 7)].tolist()
+    )
+
+    # (shift, mask) stages moving bit i of a 64-bit value to bit 2i
+    SPREAD_MASKS = (
+        (32, 0x00000000FFFFFFFF00000000FFFFFFFF),
+        (16, 0x0000FFFF0000FFFF0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F0F0F0F0F0F0F0F0F),
+        (2, 0x33333333333333333333333333333333),
+        (1, 0x55555555555555555555555555555555),
+    )
+
+    # Lazily built by `_media_ref_tables`
+    _MEDIA_REF_TABLES: Optional[Tuple[Tuple[int, ...], ...]] = None
 
     def encode(self, media_ref: int) -> List[int]:
         """
@@ -22,80 +48,160 @@ class Encoder(BaseCodec):
         6. Permute bits to spread errors
         7. Map to Gray code bar heights
         8. Add reference bars
+
+        Results are memoized per media reference.
+        """
+        return list(_encode_media_ref(media_ref))
+
+    def _encode(self, media_ref: int) -> Tuple[int, ...]:
+        """Implementation of `encode`; returns an immutable tuple."""
+        # Steps 1-6 are linear over GF(2) in the media reference bits, so
+        # they reduce to XORing one precomputed contribution per input byte
+        permuted = 0
+        media_bytes = (media_ref & self.MEDIA_REF_MASK).to_bytes(5, "little")
+        for table, byte in zip(self._media_ref_tables(), media_bytes):
+            permuted ^= table[byte]
+
+        # Step 7: Convert to Gray code bar heights
+        bar_heights = [
+            self.GRAY_CODE_LSB_FIRST[(permuted >> shift) & 7]
+            for shift in range(0, 60, 3)
+        ]
+
+        # Step 8: Add reference bars (0 at start, 7 at position 11, 0 at end)
+        bar_heights = [0] + bar_heights[:10] + [7] + bar_heights[10:] + [0]
+
+        return tuple(bar_heights)
+
+    def _encode_bits(self, media_ref: int) -> int:
+        """
+        Run steps 1-6 of `encode` one at a time.
+
+        Bit sequences are carried as Python ints with element i of the
+        sequence stored in bit i (LSB-first), so every step is a handful of
+        shift/mask operations rather than a pass over a list.
+
+        Returns:
+            The 60 punctured and permuted bits, LSB-first
         """
         # Step 1: Media reference to binary
-        media_bits = self._int_to_bits(media_ref, 37)
+        media_bits = media_ref & self.MEDIA_REF_MASK
 
-        # Step 2: CRC calculation
+        # Step 2: CRC calculation; the checksum follows the (LSB-first) data
+        # bits MSB-first, hence the bit reversal
         check_bits = self._crc8(media_bits)
-        data_with_crc = media_bits[::-1] + check_bits
+        data_with_crc = media_bits | (self.BITREV8[check_bits] << 37)
 
         # Step 3: Convolutional encoding with tail biting
-        parity0 = self._convolutional_encode(data_with_crc, self.G0)
-        parity1 = self._convolutional_encode(data_with_crc, self.G1)
+        parity0 = self._convolutional_encode(data_with_crc, 45, self.G0)
+        parity1 = self._convolutional_encode(data_with_crc, 45, self.G1)
 
         # Step 4: Interleave parity bits (a0, b0, a1, b1, ...)
         interleaved = self._interleave(parity0, parity1)
 
         # Step 5: Puncture (remove every 3rd bit to increase rate to 3/4)
-        punctured = self._puncture(interleaved)
-
         # Step 6: Permute bits (every 7th bit mod 60)
-        permuted = self._permute(punctured)
+        return self._select_bits(interleaved, self.PUNCTURE_PERMUTE_SOURCE)
 
-        # Step 7: Convert to Gray code bar heights
-        bar_heights = self._bits_to_gray_heights(permuted)
+    def _media_ref_tables(self) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Per-byte contributions of the media reference to `_encode_bits`.
 
-        # Step 8: Add reference bars (0 at start, 7 at position 11, 0 at end)
-        bar_heights = [0] + bar_heights[:10] + [7] + bar_heights[10:] + [0]
+        Entry `[i][b]` is the encoding of byte value b placed at byte i of
+        the media reference. The CRC has no initial value or final XOR, so
+        the whole of steps 1-6 is linear and the encoding of any reference
+        is the XOR of its bytes' entries. Built once on first use from the
+        37 single-bit encodings.
+        """
+        if Encoder._MEDIA_REF_TABLES is None:
+            columns = [self._encode_bits(1 << bit) for bit in range(37)]
+            columns += [0] * 3  # pad to 5 whole bytes
+
+            tables = []
+            for offset in range(0, 40, 8):
+                table = [0] * 256
+                for byte in range(1, 256):
+                    lowest = (byte & -byte).bit_length() - 1
+                    table[byte] = table[byte & (byte - 1)] ^ columns[offset + lowest]
+                tables.append(tuple(table))
+
+            Encoder._MEDIA_REF_TABLES = tuple(tables)
 
-        return bar_heights
+        return Encoder._MEDIA_REF_TABLES
 
-    def _crc8(self, bits: List[int]) -> List[int]:
+    def _crc8(self, bits: int) -> int:
         """
-        Calculate CRC-8 checksum using bit-by-bit polynomial division.
+        Calculate CRC-8 checksum using a byte-wise lookup table.
 
         Process:
         1. Prepend 3 zero bits (so we have 5 bytes)
         2. Reverse byte order (LSB-first within bytes)
-        3. Perform polynomial XOR division
+        3. Fold each byte into the remainder via `CRC8_TABLE`
         4. Return the 8-bit remainder as the checksum
 
+        Args:
+            bits: The 37-bit media reference as an integer
+
         Returns:
-            List of 8 bits representing the CRC-8 checksum
+            The 8-bit CRC-8 checksum as an integer
         """
-        return self._crc8_core(bits, reverse_input=False)
+        return self._crc8_value(bits)
 
-    def _convolutional_encode(
-        self, bits: List[int], polynomial: List[int]
-    ) -> List[int]:
+    def _convolutional_encode(self, bits: int, length: int, polynomial: int) -> int:
         """
         Convolutionally encode data using the given generator polynomial.
 
         Uses tail biting: prepend the last (len(poly)-1) bits to the data
-        instead of padding with zeros.
-        """
-        tail = bits[-(len(polynomial) - 1) :]
+        instead of padding with zeros. Output bit i is the parity of the
+        window starting at input bit i, i.e. the XOR of the input shifted
+        by every tap of the polynomial.
 
-        full = tail + bits
-        parity_bits = []
+        Args:
+            bits: `length` input bits, LSB-first
+            length: Number of input bits
+            polynomial: Generator taps, tap j in bit j
 
-        for i in range(len(bits)):
-            parity = 0
-            for j in range(len(polynomial)):
-                parity ^= full[i + j] * polynomial[j]
-            parity_bits.append(parity)
+        Returns:
+            `length` parity bits, LSB-first
+        """
+        memory = polynomial.bit_length() - 1
+        full = (bits >> (length - memory)) | (bits << memory)
+
+        parity_bits = 0
+        for tap in range(memory + 1):
+            if polynomial >> tap & 1:
+                parity_bits ^= full >> tap
 
-        return parity_bits
+        return parity_bits & ((1 << length) - 1)
 
-    def _interleave(self, bits0: List[int], bits1: List[int]) -> List[int]:
+    def _interleave(self, bits0: int, bits1: int) -> int:
         """Interleave two bit sequences (a0, b0, a1, b1, ...)."""
-        interleaved = []
-        for a, b in zip(bits0, bits1):
-            interleaved.append(a)
-            interleaved.append(b)
+        return self._spread_bits(bits0) | (self._spread_bits(bits1) << 1)
+
+    def _spread_bits(self, bits: int) -> int:
+        """Move bit i of a (<= 64-bit) value to bit 2i."""
+        for shift, mask in self.SPREAD_MASKS:
+            bits = (bits | (bits << shift)) & mask
+
+        return bits
+
+    def _select_bits(self, bits: int, positions: Sequence[int]) -> int:
+        """Gather `bits[positions[i]]` into bit i of the result."""
+        selected = 0
+        for dst, src in enumerate(positions):
+            selected |= (bits >> src & 1) << dst
+
+        return selected
+
+    # _int_to_bits, _bits_to_int and _bits_to_gray_heights remain available
+    # from BaseCodec for list-based callers.
+
 
-        return interleaved
+@lru_cache(maxsize=1024)
+def _encode_media_ref(media_ref: int) -> Tuple[int, ...]:
+    """Memoized `Encoder._encode`, shared by every encoder.
 
-    # _puncture, _permute, _bits_to_gray_heights, _int_to_bits, _bits_to_int
-    # are provided by BaseCodec.
+    Encoders hold no state, so the cache is keyed on the media reference
+    alone and keeps no encoder instance alive.
+    """
+    return Encoder()._encode(media_ref)
@@ -1,50 +1,95 @@
+import io
 from PIL import Image
-from typing import List
+from typing import BinaryIO, List, Union
+import numpy as np
 
 
 class Parser:
     def _otsu_threshold(self, histogram: List[int]) -> int:
-        """Calculate Otsu's threshold from histogram."""
-        total = sum(histogram)
-        sum_val = sum(i * histogram[i] for i in range(len(histogram)))
-
-        sum_b = 0
-        w_b = 0
-        max_var = 0
-        threshold = 0
-
-        for t in range(len(histogram)):
-            w_b += histogram[t]
-            if w_b == 0:
-                continue
-
-            w_f = total - w_b
-            if w_f == 0:
-                break
+        """Calculate Otsu's threshold from histogram.
 
-            sum_b += t * histogram[t]
-            mu_b = sum_b / w_b
-            mu_f = (sum_val - sum_b) / w_f
+        Class weights and sums for every candidate threshold come from
+        cumulative sums, so all between-class variances are computed at once.
+        """
+        hist = np.asarray(histogram, dtype=np.int64)
+        levels = np.arange(len(hist))
+
+        w_b = hist.cumsum()
+        w_f = hist.sum() - w_b
+        sum_b = (levels * hist).cumsum()
+        sum_val = (levels * hist).sum()
+
+        # Thresholds leaving either class empty are not candidates
+        valid = (w_b > 0) & (w_f > 0)
+        mu_b = sum_b / np.maximum(w_b, 1)
+        mu_f = (sum_val - sum_b) / np.maximum(w_f, 1)
+        var = np.where(valid, w_b * w_f * (mu_b - mu_f) ** 2, 0.0)
+
+        # First threshold with the largest positive variance, else 0
+        if not (var > 0).any():
+            return 0
+        return int(var.argmax())
+
+    def parse(self, image_path: Union[str, BinaryIO]) -> List[int]:
+        """
+        Extract bar heights from the Spotify Code (23 bars encoded as 0-7).
 
-            var = w_b * w_f * (mu_b - mu_f) ** 2
-            if var > max_var:
-                max_var = var
-                threshold = t
+        Args:
+            image_path: Path to the Spotify Code image, or a binary file object
 
-        return threshold
+        Returns:
+            List of 23 encoded bar heights (0-7), relative to the logo height
+        """
+        img = Image.open(image_path)
+        if img.mode != "L":
+            img = img.convert("L")
+        return self._parse_gray(img)
 
-    def parse(self, image_path: str) -> List[int]:
+    def parse_bytes(self, data: bytes) -> List[int]:
         """
-        Extract bar heights from the Spotify Code (23 bars encoded as 0-7).
+        Extract bar heights from encoded image data, e.g. `Renderer.render_to_bytes`.
+
+        Args:
+            data: Encoded image file contents (PNG, JPEG, ...)
+
+        Returns:
+            List of 23 encoded bar heights (0-7), relative to the logo height
+        """
+        return self.parse(io.BytesIO(data))
+
+    def parse_image(self, image: np.ndarray) -> List[int]:
+        """
+        Extract bar heights from an already decoded image, e.g. a detector ROI.
+
+        Avoids writing the image to disk and decoding it again.
 
         Args:
-            image_path: Path to the Spotify Code image
+            image: OpenCV-style BGR (H, W, 3), BGRA (H, W, 4) or grayscale
+                (H, W) uint8 array
 
         Returns:
             List of 23 encoded bar heights (0-7), relative to the logo height
+
+        Raises:
+            ValueError: If a 3-D image has neither 3 nor 4 channels
         """
-        img = Image.open(image_path).convert("L")
+        if image.ndim == 3:
+            channels = image.shape[2]
+            if channels == 3:
+                image = image[..., ::-1]  # BGR -> RGB
+            elif channels == 4:
+                image = image[..., [2, 1, 0, 3]]  # BGRA -> RGBA
+            else:
+                raise ValueError(
+                    f"Expected a BGR or BGRA image, got {channels} channels"
+                )
+        img = Image.fromarray(np.ascontiguousarray(image)).convert("L")
+        return self._parse_gray(img)
+
+    def _parse_gray(self, img: Image.Image) -> List[int]:
+        """Extract bar heights from a grayscale image (shared by `parse*`)."""
         width, height = img.size
+        gray = np.asarray(img)
 
         # Calculate Otsu threshold
         histogram = img.histogram()
@@ -52,10 +97,10 @@ class Parser:
 
         # Try both: bars as white and bars as dark; pick the better result
         bar_heights_white = self._extract_bars(
-            img, threshold, invert=False, width=width, height=height
+            gray, threshold, invert=False, width=width, height=height
         )
         bar_heights_dark = self._extract_bars(
-            img, threshold, invert=True, width=width, height=height
+            gray, threshold, invert=True, width=width, height=height
         )
 
         # Choose the polarity that yields valid bars (prefer one with 24+ detected bars)
@@ -81,12 +126,12 @@ class Parser:
         return sequence
 
     def _extract_bars(
-        self, img: Image.Image, threshold: int, invert: bool, width: int, height: int
+        self, gray: np.ndarray, threshold: int, invert: bool, width: int, height: int
     ) -> List[int]:
         """Extract bar heights using distance-based detection for pure white/black bars.
 
         Args:
-            img: Grayscale image
+            gray: Grayscale image as a (height, width) uint8 array
             threshold: Otsu threshold value (used to determine polarity)
             invert: If True, bars are dark (close to 0); else bars are white (close to 255)
             width: Image width
@@ -99,50 +144,31 @@ class Parser:
         # Strict threshold to reject off-white borders (e.g., 246) while accepting pure bars
         DISTANCE_THRESHOLD = 8
 
-        # Create binary image by checking distance to pure white (255) or pure black (0)
+        # Bar pixels as a boolean (height, width) mask, by checking distance to
+        # pure white (255) or pure black (0) in a single vectorized comparison
         if invert:
             # Bars are dark: look for pixels close to 0
-            binary_im = img.point(lambda p: 255 if p <= DISTANCE_THRESHOLD else 0)
+            mask = gray <= DISTANCE_THRESHOLD
         else:
             # Bars are white: look for pixels close to 255
-            binary_im = img.point(
-                lambda p: 255 if p >= (255 - DISTANCE_THRESHOLD) else 0
-            )
+            mask = gray >= (255 - DISTANCE_THRESHOLD)
+
+        # Per column: does it contain a bar pixel, and the top/bottom bar rows
+        has_bar = mask.any(axis=0)
+        min_rows = mask.argmax(axis=0)
+        max_rows = height - 1 - mask[::-1].argmax(axis=0)
+
+        # Runs of consecutive bar columns; each run is one bar
+        edges = np.flatnonzero(np.diff(has_bar, prepend=False, append=False))
+        starts, ends = edges[::2], edges[1::2]
 
         bar_heights = []
-        in_bar = False
-        current_bar_min = height
-        current_bar_max = -1
-
-        for x in range(width):
-            # Find top and bottom of white pixels in this column
-            min_row = height
-            max_row = -1
-
-            for y in range(height):
-                pixel = binary_im.getpixel((x, y))
-                if pixel > 128:  # White pixel (bar)
-                    min_row = min(min_row, y)
-                    max_row = max(max_row, y)
-
-            # Check if we have a bar in this column
-            has_bar = max_row >= 0
-
-            if has_bar:
-                if not in_bar:
-                    # Starting a new bar
-                    in_bar = True
-                    current_bar_min = min_row
-                    current_bar_max = max_row
-                else:
-                    # Continue bar
-                    current_bar_min = min(current_bar_min, min_row)
-                    current_bar_max = max(current_bar_max, max_row)
-            else:
-                if in_bar:
-                    # Ending a bar
-                    bar_height = current_bar_max - current_bar_min
-                    bar_heights.append(bar_height)
-                    in_bar = False
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end == width:
+                # A bar still open at the right edge is never closed, so skip it
+                break
+            bar_top = min_rows[start:end].min()
+            bar_bottom = max_rows[start:end].max()
+            bar_heights.append(int(bar_bottom - bar_top))
 
         return bar_heights
@@ -1,43 +1,61 @@
-from typing import List
-from PIL import Image, ImageDraw, ImageOps
-
-ACCEPTABLE_BG_COLORS = {
-    "#ffffff",
-    "#010101",
-    "#3c94f0",
-    "#4b23f2",
-    "#2a48b4",
-    "#1a3366",
-    "#8fbbca",
-    "#78e9d7",
-    "#24e07d",
-    "#27ef3a",
-    "#368a7d",
-    "#0b664f",
-    "#afe8bd",
-    "#baed54",
-    "#fdbc59",
-    "#f4dc31",
-    "#f88d25",
-    "#84482f",
-    "#c18b7f",
-    "#c87951",
-    "#fc572c",
-    "#fc2d29",
-    "#f40d2f",
-    "#8d0732",
-    "#fec1c9",
-    "#b091c1",
-    "#fb6c98",
-    "#f91d9f",
-    "#b31990",
-    "#543651",
-}
-
-ACCEPTABLE_BAR_COLORS = {
-    "#000000",
-    "#ffffff",
-}
+import io
+import os
+import re
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageOps
+from .base import _validate_bar_heights
+
+ACCEPTABLE_BG_COLORS = frozenset(
+    {
+        "#ffffff",
+        "#010101",
+        "#3c94f0",
+        "#4b23f2",
+        "#2a48b4",
+        "#1a3366",
+        "#8fbbca",
+        "#78e9d7",
+        "#24e07d",
+        "#27ef3a",
+        "#368a7d",
+        "#0b664f",
+        "#afe8bd",
+        "#baed54",
+        "#fdbc59",
+        "#f4dc31",
+        "#f88d25",
+        "#84482f",
+        "#c18b7f",
+        "#c87951",
+        "#fc572c",
+        "#fc2d29",
+        "#f40d2f",
+        "#8d0732",
+        "#fec1c9",
+        "#b091c1",
+        "#fb6c98",
+        "#f91d9f",
+        "#b31990",
+        "#543651",
+    }
+)
+
+ACCEPTABLE_BAR_COLORS = frozenset(
+    {
+        "#000000",
+        "#ffffff",
+    }
+)
+
+_HEX_COLOR_RE = re.compile(r"#[0-9a-fA-F]{6}\Z")
+
+
+@lru_cache(maxsize=None)
+def _color_rgb(color: str) -> Tuple[int, ...]:
+    """RGB tuple of a color string, parsed once per distinct color."""
+    return ImageColor.getrgb(color)
 
 
 class Renderer:
@@ -82,87 +100,255 @@ class Renderer:
 
         self.bar_padding = bar_padding
         self.height = height
+        # Decoded logo, loaded on first use and shared by `with_colors` clones
+        self._logo_img: Optional[Image.Image] = None
+        # Recolored and resized logo by (bg, bar) RGB, see `_colored_logo`
+        self._logo_cache: Dict[
+            Tuple[Tuple[int, ...], Tuple[int, ...]], Image.Image
+        ] = {}
+        # Background and logo pixels by colors, padding and geometry, see
+        # `_blank_canvas`
+        self._canvas_cache: Dict[Tuple, np.ndarray] = {}
+        # Rasterized bar shapes by (height, bar_width), filled in by `_bar_mask`
+        self._bar_masks: Dict[Tuple[int, int], np.ndarray] = {}
+
+    # Derived from the current color attributes on every access, so
+    # reassigning `bg_color` or `bar_color` on an instance takes effect
+    @property
+    def _bg_rgb(self) -> Tuple[int, ...]:
+        return _color_rgb(self.bg_color)
+
+    @property
+    def _bar_rgb(self) -> Tuple[int, ...]:
+        return _color_rgb(self.bar_color)
+
+    @property
+    def _bar_pixel(self) -> np.uint32:
+        """Opaque bar color as one packed RGBA pixel, in native byte order."""
+        return np.frombuffer(bytes(self._bar_rgb + (255,)), np.uint32)[0]
+
+    @property
+    def _image_mode(self) -> str:
+        """PIL mode to save renders in.
+
+        Gray-only color pairs lose nothing as 8-bit grayscale, which is a
+        third of the pixel data to encode and decode.
+        """
+        gray = len(set(self._bg_rgb)) == len(set(self._bar_rgb)) == 1
+        return "L" if gray else "RGB"
+
+    def with_colors(self, bg_color: str, bar_color: str) -> "Renderer":
+        """
+        Return a renderer with the same geometry and logo but different colors.
+
+        The decoded logo image is shared with the new renderer instead of
+        being read from disk again.
+
+        Args:
+            bg_color: Background color in hex. See ACCEPTABLE_BG_COLORS for options.
+            bar_color: Bar color in hex. See ACCEPTABLE_BAR_COLORS for options.
+        """
+        renderer = Renderer(
+            self.logo_path,
+            bar_width=self.bar_width,
+            bg_color=bg_color,
+            bar_color=bar_color,
+            bar_padding=self.bar_padding,
+            height=self.height,
+        )
+        renderer._logo_img = self._load_logo()
+        return renderer
 
     def render(
         self,
         bar_heights: List[int],
-        filename: str = "code.png",
+        filename: Union[str, BinaryIO] = "code.png",
         logo_padding: int = 10,
+        compress_level: int = 6,
     ):
         """
         Render bar heights to a PNG image.
 
         Args:
-            bar_heights: List of bar heights (0-7)
-            filename: Output filename
+            bar_heights: List of 23 bar heights, whole numbers 0-7
+            filename: Output filename, or a binary file object to write PNG data to
+            logo_padding: Padding between logo and bars in pixels (default 10)
+            compress_level: PNG zlib compression level, 0 (none) to 9 (default 6).
+                Lower levels save much faster for throwaway or intermediate images.
+
+        When both colors are grays (e.g. the default black and white) the
+        image is saved as grayscale, otherwise as RGB.
+
+        Raises:
+            ValueError: If there are not 23 bars or a height is not a whole
+                number from 0 to 7 (fractional heights are not drawn)
+        """
+        img = self._render_image(bar_heights, logo_padding)
+        # A file object has no extension to infer the format from
+        image_format = None if isinstance(filename, (str, os.PathLike)) else "PNG"
+        img.save(filename, format=image_format, compress_level=compress_level)
+
+    def render_to_bytes(
+        self,
+        bar_heights: List[int],
+        logo_padding: int = 10,
+        compress_level: int = 6,
+    ) -> bytes:
+        """
+        Render bar heights to PNG data in memory instead of a file.
+
+        Args:
+            bar_heights: List of 23 bar heights, whole numbers 0-7
             logo_padding: Padding between logo and bars in pixels (default 10)
+            compress_level: PNG zlib compression level, 0 (none) to 9 (default 6).
+
+        Returns:
+            The encoded PNG image
         """
-        if len(bar_heights) != 23:
-            raise ValueError(f"Expected 23 bars, got {len(bar_heights)}")
+        buffer = io.BytesIO()
+        self.render(bar_heights, buffer, logo_padding, compress_level)
+        return buffer.getvalue()
 
-        if not all(0 <= h <= 7 for h in bar_heights):
-            raise ValueError("Bar heights must be between 0 and 7")
+    def render_array(
+        self, bar_heights: List[int], logo_padding: int = 10
+    ) -> np.ndarray:
+        """
+        Render bar heights to pixels without encoding a PNG.
 
-        if not self.logo_path:
-            raise ValueError("Logo path must be provided")
+        Args:
+            bar_heights: List of 23 bar heights, whole numbers 0-7
+            logo_padding: Padding between logo and bars in pixels (default 10)
 
-        logo_img = Image.open(self.logo_path)
-        # Recolor logo background (black) to bg_color and logo (white) to bar_color
-        logo_img = self._recolor_logo_background(logo_img)
-        # Logo height equals max bar height (7 + 1) * bar_width
-        logo_size = logo_img.height
+        Returns:
+            OpenCV-style BGR (H, W, 3) uint8 array, as taken by `Parser.parse_image`
+        """
+        canvas = self._render_canvas(bar_heights, logo_padding)
+        return np.ascontiguousarray(canvas[..., 2::-1])
 
-        bars_width = (
-            len(bar_heights) * self.bar_width
-            + (len(bar_heights) - 1) * self.bar_padding
-        )
-        width = logo_size + logo_padding + bars_width + 20
-        center_y = self.height // 2
+    def _render_image(self, bar_heights: List[int], logo_padding: int) -> Image.Image:
+        """Draw the logo and bars for `render` and `render_to_bytes`."""
+        canvas = self._render_canvas(bar_heights, logo_padding)
+        return Image.fromarray(canvas, "RGBA").convert(self._image_mode)
 
-        img = Image.new("RGB", (width, self.height), color=self.bg_color)
-        draw = ImageDraw.Draw(img)
+    def _render_canvas(self, bar_heights: List[int], logo_padding: int) -> np.ndarray:
+        """Validate bar heights and draw the logo and bars as RGBA pixels."""
+        _validate_bar_heights(bar_heights)
 
-        logo_img = logo_img.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
-        logo_y = (self.height - logo_size) // 2
-        img.paste(logo_img, (0, logo_y), logo_img)
+        # Stamp the bars straight into a copy of the prepared background and
+        # logo; each bar is one of only eight shapes, so their masks are
+        # rasterized once and reused. Viewing RGBA pixels as uint32 makes
+        # each pixel a single store.
+        canvas = self._blank_canvas(logo_padding).copy()
+        pixels = canvas.view(np.uint32)[..., 0]
+        width = canvas.shape[1]
+        logo_size = self._colored_logo().height
+        center_y = self.height // 2
+        bar_pixel = self._bar_pixel
 
         bars_start_x = logo_size + logo_padding
-        bar_heights = [h + 1 for h in bar_heights]
-        for i, bar_height in enumerate(bar_heights):
+        for i, height in enumerate(bar_heights):
+            # Heights 0-7 are drawn as 1-8 units tall; int() because the
+            # subset check also lets through whole-number floats like 3.0
+            bar_height = int(height) + 1
             x0 = bars_start_x + i * (self.bar_width + self.bar_padding)
             bar_half_height = (bar_height * self.bar_width) // 2
             y0 = center_y - bar_half_height
-            x1 = x0 + self.bar_width
-            y1 = center_y + bar_half_height
 
-            draw.rounded_rectangle([x0, y0, x1, y1], radius=4, fill=self.bar_color)
+            mask = self._bar_mask(bar_height)
+            # Clip to the canvas the same way drawing onto the image would
+            top = max(0, -y0)
+            mask = mask[top : self.height - y0, : width - x0]
+            bar = pixels[y0 + top : y0 + top + mask.shape[0], x0 : x0 + mask.shape[1]]
+            bar[mask] = bar_pixel
+
+        return canvas
 
-        img.save(filename)
+    def _blank_canvas(self, logo_padding: int) -> np.ndarray:
+        """RGBA pixels of the background with the logo pasted, before any bars.
+
+        Identical for every render with the same colors, padding and
+        geometry, so it is built once and copied per render.
+        """
+        key = (
+            self._bg_rgb,
+            self._bar_rgb,
+            logo_padding,
+            self.height,
+            self.bar_width,
+            self.bar_padding,
+        )
+        canvas = self._canvas_cache.get(key)
+        if canvas is None:
+            logo_img = self._colored_logo()
+            # Logo height equals max bar height (7 + 1) * bar_width
+            logo_size = logo_img.height
+
+            bars_width = 23 * self.bar_width + 22 * self.bar_padding
+            width = logo_size + logo_padding + bars_width + 20
+
+            img = Image.new("RGBA", (width, self.height), color=self._bg_rgb)
+            logo_y = (self.height - logo_size) // 2
+            img.paste(logo_img, (0, logo_y))
+
+            canvas = self._canvas_cache[key] = np.array(img)
+        return canvas
+
+    def _bar_mask(self, bar_height: int) -> np.ndarray:
+        """Boolean pixel mask of a rounded bar `bar_height` units (1-8) tall.
+
+        Rasterized once per height and bar width with
+        `ImageDraw.rounded_rectangle`, so the stamped bars match drawing each
+        one onto the image directly.
+        """
+        key = (bar_height, self.bar_width)
+        mask = self._bar_masks.get(key)
+        if mask is None:
+            bar_half_height = (bar_height * self.bar_width) // 2
+            shape = Image.new("1", (self.bar_width + 1, 2 * bar_half_height + 1))
+            ImageDraw.Draw(shape).rounded_rectangle(
+                [0, 0, self.bar_width, 2 * bar_half_height], radius=4, fill=1
+            )
+            mask = self._bar_masks[key] = np.array(shape)
+        return mask
+
+    def _load_logo(self) -> Image.Image:
+        """Decode the logo image once and reuse it for every render."""
+        if self._logo_img is None:
+            if not self.logo_path:
+                raise ValueError("Logo path must be provided")
+            self._logo_img = Image.open(self.logo_path)
+            self._logo_img.load()
+        return self._logo_img
+
+    def _colored_logo(self) -> Image.Image:
+        """Recolored, square-resized logo, prepared once per color pair."""
+        key = (self._bg_rgb, self._bar_rgb)
+        logo_img = self._logo_cache.get(key)
+        if logo_img is None:
+            # Recolor logo background (black) to bg_color and logo (white) to bar_color
+            logo_img = self._recolor_logo_background(self._load_logo())
+            logo_size = logo_img.height
+            logo_img = logo_img.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
+            self._logo_cache[key] = logo_img
+        return logo_img
 
     def _recolor_logo_background(self, logo_img: Image.Image) -> Image.Image:
         """Map black background to bg_color and white logo to bar_color.
 
         Assumes the logo image is a white shape on a black background.
-        Uses ImageOps.colorize for clean anti-aliased recoloring.
+        Uses ImageOps.colorize for clean anti-aliased recoloring. The result
+        is opaque RGB: the logo's own alpha is dropped by the grayscale step,
+        so it is pasted without a mask.
         """
-        gray = logo_img.convert("L")
-        colored = ImageOps.colorize(gray, black=self.bg_color, white=self.bar_color)
-        return colored.convert("RGBA")
+        gray = logo_img if logo_img.mode == "L" else logo_img.convert("L")
+        return ImageOps.colorize(gray, black=self._bg_rgb, white=self._bar_rgb)
 
     def _is_hex_color(self, color: str) -> bool:
         """Return True if color is a valid #RRGGBB hex string."""
         if not isinstance(color, str):
             return False
 
-        if len(color) != 7 or not color.startswith("#"):
-            return False
-
-        hex_str = color[1:]
-        try:
-            int(hex_str, 16)
-            return True
-        except ValueError:
-            return False
+        return _HEX_COLOR_RE.match(color) is not None
 
     def _validate_bg_color(self, color: str) -> str:
         """Validate background color against acceptable list.
@@ -174,8 +360,10 @@ class Renderer:
         if not isinstance(color, str):
             raise ValueError("Background color must be a string")
 
+        # Every acceptable color is a #rrggbb string, so membership alone
+        # validates the format
         lower = color.lower()
-        if self._is_hex_color(color) and lower in ACCEPTABLE_BG_COLORS:
+        if lower in ACCEPTABLE_BG_COLORS:
             return lower
 
         raise ValueError(
@@ -188,7 +376,7 @@ class Renderer:
             raise ValueError("Bar color must be a string")
 
         lower = color.lower()
-        if self._is_hex_color(color) and lower in ACCEPTABLE_BAR_COLORS:
+        if lower in ACCEPTABLE_BAR_COLORS:
             return lower
 
         raise ValueError("Invalid bar color. Only black or white are allowed.")
@@ -0,0 +1,11 @@
+import numpy as np
+from spotify_codes.renderer import ACCEPTABLE_BG_COLORS
+
+
+# Split backgrounds into dark and light by luminance, computed for all colors
+# at once. Sorted so every pytest-xdist worker collects the same parametrization.
+_BG_COLORS = sorted(ACCEPTABLE_BG_COLORS)
+_BG_RGB = np.array([list(bytes.fromhex(c[1:])) for c in _BG_COLORS], dtype=np.uint8)
+_BG_IS_DARK = _BG_RGB @ np.array([0.2126, 0.7152, 0.0722]) < 140
+DARK_BACKGROUNDS = [c for c, dark in zip(_BG_COLORS, _BG_IS_DARK) if dark]
+LIGHT_BACKGROUNDS = [c for c, dark in zip(_BG_COLORS, _BG_IS_DARK) if not dark]
@@ -1,6 +1,9 @@
+import gc
+import weakref
 from typing import List
 import pytest
 from spotify_codes import Decoder
+from spotify_codes.decoder import _decode_heights
 
 
 class TestDecoder:
@@ -71,3 +74,54 @@ class TestDecoder:
         """Test Gray code conversion for all 8 possible 3-bit triplets."""
         result = self.decoder._gray_heights_to_bits(heights)
         assert result == expected_bits
+
+    def test_decode_batch_matches_decode(self):
+        """Test batch decoding agrees with decoding one code at a time."""
+        heights_list = [
+            [0, 5, 7, 4, 1, 4, 6, 6, 0, 2, 4, 7, 3, 4, 6, 7, 5, 5, 6, 0, 5, 0, 0],
+            [0, 5, 0, 3, 4, 5, 0, 4, 5, 0, 3, 7, 3, 6, 1, 5, 5, 2, 4, 4, 4, 3, 0],
+            [0, 6, 6, 7, 1, 7, 3, 0, 0, 3, 4, 7, 1, 4, 3, 4, 1, 7, 4, 6, 5, 7, 0],
+            # Corrupted copy of the first code (fails the CRC check)
+            [0, 5, 7, 4, 1, 4, 6, 6, 0, 2, 4, 7, 3, 4, 6, 7, 5, 5, 6, 0, 5, 1, 0],
+        ]
+
+        result = self.decoder.decode_batch(heights_list)
+
+        assert result == [57639171874, 57268659651, 67775490487, -1]
+        assert result == [self.decoder.decode(h) for h in heights_list]
+
+    def test_decode_batch_empty(self):
+        """Test batch decoding of no codes returns an empty list."""
+        assert self.decoder.decode_batch([]) == []
+
+    def test_decode_rejects_invalid_bar_heights(self):
+        """Test that decode and decode_batch reject malformed bar heights."""
+        valid = [0, 5, 7, 4, 1, 4, 6, 6, 0, 2, 4, 7, 3, 4, 6, 7, 5, 5, 6, 0, 5, 0, 0]
+
+        for bar_heights, message in [
+            # Would otherwise decode the end reference bar as data
+            (valid[:22], "Expected 23 bars"),
+            # Would otherwise wrap around to height 7
+            (valid[:5] + [-1] + valid[6:], "between 0 and 7"),
+            (valid[:5] + [8] + valid[6:], "between 0 and 7"),
+        ]:
+            with pytest.raises(ValueError, match=message):
+                self.decoder.decode(bar_heights)
+
+            with pytest.raises(ValueError, match=message):
+                self.decoder.decode_batch([bar_heights])
+
+    def test_decode_memo_shared_across_instances(self):
+        """Test that fresh decoders share the memo and are not kept alive by it."""
+        heights = [0, 5, 7, 4, 1, 4, 6, 6, 0, 2, 4, 7, 3, 4, 6, 7, 5, 5, 6, 0, 5, 0, 0]
+        Decoder().decode(heights)
+        hits = _decode_heights.cache_info().hits
+
+        decoder = Decoder()
+        assert decoder.decode(heights) == self.decoder.decode(heights) == 57639171874
+        assert _decode_heights.cache_info().hits == hits + 2
+
+        ref = weakref.ref(decoder)
+        del decoder
+        gc.collect()
+        assert ref() is None
@@ -1,3 +1,4 @@
+import tempfile
 import pytest
 from pathlib import Path
 import cv2
@@ -50,6 +51,33 @@ class TestDetector:
         assert x >= 0 and y >= 0
         assert w > 0 and h > 0
 
+    def test_detect_barcode_native_size_code_on_large_canvas(self):
+        """Test that a normal-size code on a large image matches a small one."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0]  # fmt: skip
+        code = self.renderer.render_array(bar_heights)
+        code_h, code_w = code.shape[:2]
+
+        matches = []
+        for canvas_w, canvas_h in [(1000, 600), (2560, 1440), (4000, 3000)]:
+            canvas = np.empty((canvas_h, canvas_w, 3), dtype=np.uint8)
+            canvas[:] = code[0, 0]
+            x0, y0 = canvas_w // 2, canvas_h // 2
+            canvas[y0 : y0 + code_h, x0 : x0 + code_w] = code
+
+            with tempfile.TemporaryDirectory() as tmpdir:
+                image_file = Path(tmpdir) / "canvas.png"
+                cv2.imwrite(str(image_file), canvas)
+                result = self.detector.detect_barcode(str(image_file))
+
+            assert result.found, f"Logo should be found on {canvas_w}x{canvas_h}"
+            x, y, _, h = result.position
+            matches.append((x - x0, y - y0, h, round(result.logo_confidence, 4)))
+
+        # The logo is matched at the same offset, size and confidence at any
+        # canvas size
+        assert matches[0][3] > 0.9
+        assert matches[1:] == [matches[0]] * 2
+
     def test_locate_logo_with_standard_image(self):
         """Test logo detection on known barcode."""
         if not SAMPLE_BARCODES_DIR.exists():
@@ -65,6 +93,17 @@ class TestDetector:
         assert x >= 0 and y >= 0
         assert w > 0 and h > 0
 
+    def test_locate_logo_accepts_grayscale(self):
+        """Test logo detection gives the same result for gray and BGR input."""
+        if not SAMPLE_BARCODES_DIR.exists():
+            pytest.skip("Sample barcodes not available")
+
+        barcode_file = Path.joinpath(SAMPLE_BARCODES_DIR, "5726865965.png")
+        image = cv2.imread(str(barcode_file))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        assert self.detector._locate_logo(gray) == self.detector._locate_logo(image)
+
     def test_locate_logo_multiframe_rejection(self):
         """Test logo detection rejects images without logo."""
         # Create an image without the logo
@@ -99,18 +138,22 @@ class TestDetector:
         assert region is None
 
     def test_hex_color_distance(self):
-        """Test hex color distance calculation."""
+        """Test squared hex color distance calculation."""
         # Same color
         dist = self.detector._hex_color_distance("#ffffff", "#ffffff")
         assert dist == 0
 
         # Black and white
         dist = self.detector._hex_color_distance("#000000", "#ffffff")
-        assert dist > 400  # Max distance is ~441
+        assert dist == 3 * 255**2  # Max distance
 
         # Similar colors
         dist = self.detector._hex_color_distance("#ff0000", "#fe0000")
-        assert dist < 2
+        assert dist == 1
+
+        # Within the background color tolerance
+        dist = self.detector._hex_color_distance("#f40d2f", "#fc2d29")
+        assert dist < 80 * 80
 
     def test_validate_background_color_known_colors(self):
         """Test background color validation with acceptable colors."""
@@ -1,5 +1,8 @@
+import gc
+import weakref
 import pytest
 from spotify_codes import Encoder
+from spotify_codes.encoder import _encode_media_ref
 
 
 class TestEncoder:
@@ -104,6 +107,19 @@ class TestEncoder:
         bar_heights = self.encoder.encode(media_ref)
         assert bar_heights == expected
 
+    @pytest.mark.parametrize(
+        "media_ref", [0, 1, 57639171874, 2**37 - 1, 2**40 + 12345]
+    )
+    def test_encode_tables_match_pipeline(self, media_ref):
+        """Test that the byte tables reproduce the step-by-step encoding."""
+        permuted = self.encoder._encode_bits(media_ref)
+        heights = [
+            self.encoder.GRAY_CODE_LSB_FIRST[(permuted >> shift) & 7]
+            for shift in range(0, 60, 3)
+        ]
+        bar_heights = self.encoder.encode(media_ref)
+        assert bar_heights[1:11] + bar_heights[12:22] == heights
+
     @pytest.mark.parametrize(
         "bits,expected_heights",
         [
@@ -121,3 +137,17 @@ class TestEncoder:
         """Test Gray code conversion for all 8 possible 3-bit triplets."""
         heights = self.encoder._bits_to_gray_heights(bits)
         assert heights == expected_heights
+
+    def test_encode_memo_shared_across_instances(self):
+        """Test that fresh encoders share the memo and are not kept alive by it."""
+        Encoder().encode(57639171874)
+        hits = _encode_media_ref.cache_info().hits
+
+        encoder = Encoder()
+        assert encoder.encode(57639171874) == self.encoder.encode(57639171874)
+        assert _encode_media_ref.cache_info().hits == hits + 2
+
+        ref = weakref.ref(encoder)
+        del encoder
+        gc.collect()
+        assert ref() is None
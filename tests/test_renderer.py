@@ -1,5 +1,10 @@
+import io
+import tempfile
+import cv2
+import numpy as np
 import pytest
 from pathlib import Path
+from PIL import Image, ImageChops, ImageDraw
 from spotify_codes import Renderer
 
 LOGO_PATH = Path(__file__).parent.parent / "logo.png"
@@ -28,6 +33,164 @@ class TestRenderer:
         with pytest.raises(ValueError, match="cannot be the same as background color"):
             Renderer(str(LOGO_PATH), bg_color="#010101", bar_color="#000000")
 
+    def test_with_colors_shares_logo(self):
+        """Test that with_colors keeps geometry and reuses the decoded logo."""
+        renderer = self.renderer.with_colors("#ffffff", "#000000")
+
+        assert renderer.bg_color == "#ffffff"
+        assert renderer.bar_color == "#000000"
+        assert renderer.bar_width == self.renderer.bar_width
+        assert renderer.height == self.renderer.height
+        assert renderer._logo_img is self.renderer._logo_img
+
+    def test_with_colors_validates_colors(self):
+        """Test that with_colors applies the same color validation."""
+        with pytest.raises(ValueError, match="cannot be the same as background color"):
+            self.renderer.with_colors("#ffffff", "#ffffff")
+
+    def test_render_compress_level(self):
+        """Test that the PNG compression level changes size but not pixels."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stored = Path(tmpdir) / "stored.png"
+            compressed = Path(tmpdir) / "compressed.png"
+            self.renderer.render(bar_heights, str(stored), compress_level=0)
+            self.renderer.render(bar_heights, str(compressed), compress_level=9)
+
+            assert stored.stat().st_size > compressed.stat().st_size
+            with Image.open(stored) as a, Image.open(compressed) as b:
+                assert ImageChops.difference(a, b).getbbox() is None
+
+    def test_render_to_bytes_matches_render(self):
+        """Test that in-memory rendering produces the same PNG as a file."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = Path(tmpdir) / "code.png"
+            self.renderer.render(bar_heights, str(output), compress_level=1)
+            data = self.renderer.render_to_bytes(bar_heights, compress_level=1)
+
+            assert data == output.read_bytes()
+
+    def test_render_array_matches_render_to_bytes(self):
+        """Test that rendered pixels match the decoded PNG, in BGR order."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        image = self.renderer.render_array(bar_heights)
+        data = self.renderer.render_to_bytes(bar_heights, compress_level=0)
+        decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+        assert image.dtype == np.uint8
+        assert np.array_equal(image, decoded)
+
+    def test_render_grayscale_colors_as_grayscale_png(self):
+        """Test that gray-only color pairs are saved as 8-bit grayscale."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        for renderer, mode in [
+            (self.renderer, "L"),
+            (self.renderer.with_colors("#ffffff", "#000000"), "L"),
+            (self.renderer.with_colors("#3c94f0", "#000000"), "RGB"),
+        ]:
+            data = renderer.render_to_bytes(bar_heights, compress_level=0)
+            with Image.open(io.BytesIO(data)) as img:
+                assert img.mode == mode
+                decoded = np.asarray(img.convert("RGB"))[..., ::-1]
+            assert np.array_equal(decoded, renderer.render_array(bar_heights))
+
+    def test_render_to_bytes_invalid_bar_count(self):
+        """Test that in-memory rendering validates bar heights too."""
+        with pytest.raises(ValueError, match="Expected 23 bars"):
+            self.renderer.render_to_bytes([0] * 22)
+
+    def test_render_reuses_blank_canvas(self):
+        """Test that bars from one render do not leak into the next."""
+        tall = [7] * 23
+        short = [0] * 23
+
+        self.renderer.render_to_bytes(tall)
+        fresh = Renderer(str(LOGO_PATH))
+        assert self.renderer.render_to_bytes(short) == fresh.render_to_bytes(short)
+
+    def test_render_bars_match_rounded_rectangles(self):
+        """Test that stamped bars cover exactly the rounded rectangle pixels."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+        r = self.renderer
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = Path(tmpdir) / "code.png"
+            r.render(bar_heights, str(output), logo_padding=10)
+            with Image.open(output) as img:
+                rendered = img.convert("RGB")
+
+        bars_start_x = r._load_logo().height + 10
+        redrawn = rendered.copy()
+        erased = rendered.copy()
+        for i, bar_height in enumerate(bar_heights):
+            x0 = bars_start_x + i * (r.bar_width + r.bar_padding)
+            half = ((bar_height + 1) * r.bar_width) // 2
+            box = [x0, r.height // 2 - half, x0 + r.bar_width, r.height // 2 + half]
+            ImageDraw.Draw(redrawn).rounded_rectangle(box, radius=4, fill=r.bar_color)
+            ImageDraw.Draw(erased).rounded_rectangle(box, radius=4, fill=r.bg_color)
+
+        assert ImageChops.difference(rendered, redrawn).getbbox() is None
+        background = Image.new("RGB", rendered.size, r.bg_color)
+        bars_area = (bars_start_x, 0, rendered.width, rendered.height)
+        assert (
+            ImageChops.difference(erased, background).crop(bars_area).getbbox() is None
+        )
+
+    def test_colored_logo_cached_per_colors(self):
+        """Test that the recolored logo is prepared once per color pair."""
+        logo = self.renderer._colored_logo()
+        assert self.renderer._colored_logo() is logo
+        assert logo.width == logo.height == self.renderer._load_logo().height
+
+        other = self.renderer.with_colors("#ffffff", "#000000")
+        assert other._colored_logo() is not logo
+
+    def test_render_after_reassigning_colors(self):
+        """Test that changing colors on an instance is not hidden by caches."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        self.renderer.render_to_bytes(bar_heights)
+        self.renderer.bg_color = "#3c94f0"
+        self.renderer.bar_color = "#000000"
+
+        fresh = Renderer(str(LOGO_PATH), bg_color="#3c94f0", bar_color="#000000")
+        assert self.renderer.render_to_bytes(bar_heights) == fresh.render_to_bytes(
+            bar_heights
+        )
+
+    def test_render_after_changing_geometry(self):
+        """Test that changing bar size or height is not hidden by caches."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        self.renderer.render_to_bytes(bar_heights)
+        self.renderer.height = 200
+        self.renderer.bar_width = 12
+        self.renderer.bar_padding = 6
+
+        fresh = Renderer(str(LOGO_PATH), bar_width=12, bar_padding=6, height=200)
+        assert self.renderer.render_to_bytes(bar_heights) == fresh.render_to_bytes(
+            bar_heights
+        )
+
+    def test_render_grayscale_logo(self):
+        """Test that a grayscale logo renders like the original RGBA logo."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            gray_logo = Path(tmpdir) / "logo_l.png"
+            with Image.open(LOGO_PATH) as logo:
+                logo.convert("L").save(gray_logo)
+
+            renderer = Renderer(str(gray_logo))
+            assert renderer._load_logo().mode == "L"
+            expected = self.renderer.render_to_bytes(bar_heights)
+            assert renderer.render_to_bytes(bar_heights) == expected
+
     def test_render_invalid_bar_count(self):
         """Test that render rejects wrong number of bars."""
         bar_heights = [0, 5, 7]
@@ -42,6 +205,21 @@ class TestRenderer:
         with pytest.raises(ValueError, match="must be between 0 and 7"):
             self.renderer.render(bar_heights, self.test_output)
 
+    def test_render_non_integer_bar_height(self):
+        """Test that render rejects fractional bar heights (only whole 0-7)."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,3.5,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        with pytest.raises(ValueError, match="whole numbers"):
+            self.renderer.render(bar_heights, self.test_output)
+
+    def test_render_whole_number_float_bar_heights(self):
+        """Test that whole-number float heights render like their ints."""
+        bar_heights = [0,5,7,4,1,4,6,6,0,2,4,7,3,4,6,7,5,5,6,0,5,0,0] # fmt: skip
+
+        expected = self.renderer.render_to_bytes(bar_heights)
+        floats = [float(h) for h in bar_heights]
+        assert self.renderer.render_to_bytes(floats) == expected
+
     def test_is_hex_color(self):
         """Test is hex color."""
         assert self.renderer._is_hex_color("#000000")
@@ -55,6 +233,10 @@ class TestRenderer:
         assert not self.renderer._is_hex_color("invalid")
         assert not self.renderer._is_hex_color("color")
         assert not self.renderer._is_hex_color("white")
+        # Forms int(..., 16) alone would accept
+        assert not self.renderer._is_hex_color("# fffff")
+        assert not self.renderer._is_hex_color("#ff_fff")
+        assert not self.renderer._is_hex_color("#+fffff")
 
     def test_validate_bg_color(self):
         """Test background color validation."""